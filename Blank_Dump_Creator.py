@@ -51,9 +51,16 @@ if totalBytes > MAXIMUM_MEMORY_ADDRESS:
                      f"requested. Consider lowering the pages (-p) value.{OutputColours.END}")
 
 # Convert the hex string into an immutable array of bytes
-dumpString = bytes.fromhex(args.hexString)
+try:
+    dumpString = bytes.fromhex(args.hexString)
+except ValueError:
+    raise ValueError(f"{OutputColours.ERROR}[ERR] The hex string (-s) should be made up of pairs of hex characters, but {args.hexString} was provided.{OutputColours.END}") from None
 dumpStringBytes = len(dumpString)
 
+# Check that there is something to fill the dump file with
+if dumpStringBytes == 0:
+    raise ValueError(f"{OutputColours.ERROR}[ERR] The hex string (-s) must contain at least one byte.{OutputColours.END}")
+
 # Ensure that either the parent directory of the output file exists, or the -f flag has been set
 if not args.outputFile.parent.exists() and not args.force:
     # If it doesn't exist and -f has not been specified, print an error message and exit the program without writing anything. User must allow creation of directories.
@@ -74,25 +81,19 @@ elif args.outputFile.exists() and args.outputFile.is_dir():
     raise SystemExit(f"{OutputColours.ERROR}[ERR] The specified output appears to be a directory.{OutputColours.END}")
 # ----------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
+# Build the entire dump in memory by repeating the dumpString enough times to cover the EEPROM. The dump is at most 64 KiB, so this is cheap.
+# A memoryview is used to trim it to the exact size, so the repeated string isn't copied again just to drop the last few bytes.
+dumpData = memoryview(dumpString * -(-totalBytes // dumpStringBytes))[:totalBytes]
+
 # Initialise the output file and a progress bar for the write operation
-with open(args.outputFile, "wb") as dumpFile:
+# Use a large write buffer so that the dump is written with as few system calls as possible. The buffer is drained when the file is closed.
+with open(args.outputFile, "wb", buffering = 1024 * 1024) as dumpFile:
     with tqdm(total = totalBytes, unit = " bytes") as writeProgress:
-        # Start at address 0
-        byteAddress = 0
-
-        # Sequentially write to the file
-        while (byteAddress < totalBytes):
-            # Calculate the number of bytes to write. This is either the full length of the dumpString, or the remaining amount of bytes to fill the EEPROM; whichever is smaller.
-            bytesToWrite = min(dumpStringBytes, (totalBytes - byteAddress))
-
-            # Write the number of bytes calculated from the string.
-            dumpFile.write(dumpString[0:bytesToWrite])
-
-            # Update the value of byte address to reflect how many bytes have been written.
-            byteAddress += bytesToWrite
+        # Write the whole dump in a single call
+        dumpFile.write(dumpData)
 
-            # Update progress bar
-            writeProgress.update(bytesToWrite)
+        # Update progress bar
+        writeProgress.update(totalBytes)
 
 # After file close, inform the user that the write completed successfully
 print(f"{OutputColours.INFO}[INFO] File written to {args.outputFile.resolve()}.")
@@ -18,6 +18,12 @@ import termtables as tt
 MAXIMUM_MEMORY_ADDRESS = 0xFFFF # These scripts only support 16-bit memory addresses.
 MAXIMUM_I2C_ADDRESS = 0xFF      # Scan the entire address space supported by I2C
 
+# BusPirate Constants
+I2C_SET_SPEED = 0x60            # The BusPirate binary I2C mode command to set the clock speed. The lower 2 bits are the speed code from I2C_SPEEDS.
+I2C_CONFIGURE = 0x40            # The BusPirate binary I2C mode command to configure the peripherals. The lower 4 bits turn on the power, pullups, AUX and CS.
+# The BusPirate binary I2C mode speed code for each of the clock speeds that can be chosen
+I2C_SPEEDS = {"400kHz": 0x03, "100kHz": 0x02, "50kHz": 0x01, "5kHz": 0x00}
+
 # Colours for output to terminal (Blender Style)
 class OutputColours:
     PINK = '\033[95m'
@@ -34,6 +40,16 @@ class OutputColours:
 def auto_int(x):
     return int(x, 0)
 
+# Function to set the I2C clock speed of the BusPirate and configure its power output and internal pullup resistors. Both commands are sent in a single serial write and both status
+# bytes are read back in one go, rather than waiting for a round trip to the BusPirate after each one.
+def configure_bus_pirate(busPirate, clockSpeed, enablePullups):
+    # The power output (bit 3) is always turned on, and the internal pullup resistors (bit 2) are only turned on if requested
+    busPirate.port.write(bytes([I2C_SET_SPEED | I2C_SPEEDS[clockSpeed], I2C_CONFIGURE | (1 << 3) | (enablePullups << 2)]))
+
+    # The BusPirate responds with 0x01 for each command it accepts
+    if busPirate.port.read(2) != b"\x01\x01":
+        raise ProtocolError(f"{OutputColours.ERROR}[ERR] The BusPirate did not accept the clock speed and power configuration.{OutputColours.END}")
+
 # ------------------------------------------------------------------------------------------------ Argument Parser -------------------------------------------------------------------------------------------------
 # Set up the argument parser to retreive inputs from the user
 parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
@@ -41,6 +57,7 @@ parser.add_argument("-s", "--search",         dest="search",        help="Attemp
 parser.add_argument("-m", "--memory-layout",  dest="memoryLayout",  help=f"Attempt to discover the memory layout of attached EEPROM(S). {OutputColours.WARNING}Warning: Will write to the EEPROM(S).{OutputColours.END}", action="store_true")
 parser.add_argument("-a", "--address",        dest="address",       help="The I2C address of the EEPROM module you would like to inspect (For -m only).",    type=auto_int,  required=False)
 parser.add_argument("-c", "--clock-speed",    dest="clockSpeed",    help="The clock speed to use when communicating with the EEPROM module.",                type=str,  required=False, default="400kHz", choices=["400kHz", "100kHz", "50kHz", "5kHz"])
+parser.add_argument("-P", "--port",           dest="port",          help="The serial port of the BusPirate. Found automatically if not given.",              type=str,  required=False, default=None)
 parser.add_argument("-e", "--enable-pullups", dest="enablePullups", help="Enable the internal pullup resistors in the BusPirate. Disabled by default.",      action="store_true")
 parser.add_argument("-v", "--verbose",        dest="verbose",       help="Print verbose messages.",                                                          action="store_true")
 
@@ -51,68 +68,54 @@ args = parser.parse_args()
 
 
 # Create a busPirate object configured to communicate over I2C
-busPirate = I2C()
+# Skip searching for the BusPirate if the user has said which port it is on
+busPirate = I2C(portname = args.port) if args.port else I2C()
 
-# Set the I2C clock speed of the BusPirate
-busPirate.speed = args.clockSpeed
-
-# Configure the BusPirate's power output and internal pullup resistors
-busPirate.configure(power = True, pullup = args.enablePullups)
+# Set the I2C clock speed of the BusPirate, and configure its power output and internal pullup resistors
+configure_bus_pirate(busPirate, args.clockSpeed, args.enablePullups)
 
 # If the -s/--search flag is set, scan through all possible I2C addresses and list addresses that responded to I2C commands with an ACK.
 if args.search == True:
-    # Create a blank array to store the valid addresses in
+    # Create a blank array to store the valid write addresses in
     foundAddresses = []
     
     # Send a start bit
     busPirate.start()
-    # Set up a progress bar to show how many addresses have been scanned
-    with tqdm(total = MAXIMUM_I2C_ADDRESS, unit = " addresses") as scanProgress:
-        # Loop through every possible address and try to write data to each. (Avoid general call address 0x00, as multiple devices may respond)
-        for scanAddress in range(1, MAXIMUM_I2C_ADDRESS + 1):
-            # Attempt to write to the current address being scanned
-            try:
-                busPirate.write_then_read(1, 1, [scanAddress])
-                # print(f"{OutputColours.INFO}[INFO] Device found at {scanAddress}.{OutputColours.END}")
-                # If an exception is not raised, the device responded and this is a valid address
-                foundAddresses += [scanAddress]
-            except ProtocolError:
-                if args.verbose == True:
-                    print(f"{OutputColours.VERBOSE}[VERBOSE] No device found at address {hex(scanAddress)}.{OutputColours.END}")
-            
-            # Update progress bar
-            scanProgress.update(1)
+    # Loop through every possible write address (even addresses) and try to write to each. A device that ACKs its write address will also have the matching read address, so there is no need to
+    # probe the read addresses as well. (Avoid general call address 0x00, as multiple devices may respond)
+    # The progress bar wraps the address range, so it updates itself (at most every 0.1 s) to show how many addresses have been scanned.
+    for scanAddress in tqdm(range(2, MAXIMUM_I2C_ADDRESS + 1, 2), unit = " addresses", mininterval = 0.1):
+        # Attempt to write to the current address being scanned, without sending any data so that nothing is written to the device.
+        # pyBusPirateLite doesn't return a status for this, it raises a ProtocolError if the device doesn't respond.
+        try:
+            busPirate.write_then_read(1, 0, [scanAddress])
+            # print(f"{OutputColours.INFO}[INFO] Device found at {scanAddress}.{OutputColours.END}")
+            # If an exception is not raised, the device responded and this is a valid address
+            foundAddresses.append(scanAddress)
+        except ProtocolError:
+            if args.verbose == True:
+                print(f"{OutputColours.VERBOSE}[VERBOSE] No device found at address {hex(scanAddress)}.{OutputColours.END}")
     # Send a stop bit
     busPirate.stop()
 
     # After the address scan is complete, report this to the user
     print(f"{OutputColours.INFO}[INFO] Address scanning complete.{OutputColours.END}")
 
-    # Sort the addresses into groups of I2C addresses, with the respective read and write addresses
+    # Work out the I2C address and the respective read address for each write address that was found
     EEPROM_Addresses = []
-    unknownAddresses = []
-    for address in foundAddresses:
+    for writeAddress in foundAddresses:
         # Get the I2C address of the EEPROM (7 most significant bits)
-        I2C_Address = (address >> 1) & 0b01111111
-        # The read address is the I2C address bit shifted with the LSB set to 1
-        readAddress = (I2C_Address << 1) | 0b00000001
-        # The read address is the I2C address bit shifted with the LSB set to 0
-        writeAddress = (I2C_Address << 1) & 0b11111110
+        I2C_Address = writeAddress >> 1
+        # The read address is the write address with the LSB set to 1
+        readAddress = writeAddress | 0b00000001
         
-        # Check that both a read and write address were found, if not it may not be an EEPROM and we should just report the found address.
-        if (readAddress in foundAddresses) and (writeAddress in foundAddresses):
-            # Only store these addresses if they have not already been stored
-            if [I2C_Address, readAddress, writeAddress] not in EEPROM_Addresses:
-                EEPROM_Addresses += [[I2C_Address, readAddress, writeAddress]]
-        else:
-            print(f"{I2C_Address} - {readAddress} - {writeAddress}")
-            unknownAddresses += [address]
+        EEPROM_Addresses.append((I2C_Address, readAddress, writeAddress))
 
     # Display the found devices using termtables if the list isn't empty
     if len(EEPROM_Addresses) != 0:
         print(f"{OutputColours.INFO}[INFO] Found valid Addresses:")
         tt.print(
-            [[hex(addr[0]), hex(addr[1]), hex(addr[2])] for addr in EEPROM_Addresses],
+            [[hex(I2C_Address), hex(readAddress), hex(writeAddress)] for I2C_Address, readAddress, writeAddress in EEPROM_Addresses],
             header=["I2C Address", "Read Address", "Write Address"],
             style=tt.styles.rounded_double,
             padding=(0, 1),
@@ -121,18 +124,6 @@ if args.search == True:
         print(OutputColours.END)
     else:
         print(f"{OutputColours.WARNING}[WARN] No EEPROM addresses were found. Please check your wiring or enable/disable internal pullups.{OutputColours.END}")
-    
-    # Display a warning if single addresses were found
-    if len(unknownAddresses) != 0:
-        print(f"{OutputColours.WARNING}[WARN] Devices with only a single address were found:")
-        tt.print(
-            [[hex(addr)] for addr in unknownAddresses],
-            header=["Unknown Addresses"],
-            style=tt.styles.rounded_double,
-            padding=(0, 1),
-            alignment="c"
-        )
-        print(OutputColours.END)
 
 # After the scan is finished, disable the power supply on the BusPirate
 #busPirate.configure(power = False)
@@ -5,7 +5,7 @@ import argparse
 from pathlib import Path
 
 # Import the pyBusPirateLite library
-from pyBusPirateLite.I2C import I2C
+from pyBusPirateLite.I2C import I2C, ProtocolError
 
 # Import the tqdm progress bar library
 from tqdm import tqdm
@@ -14,6 +14,16 @@ from tqdm import tqdm
 MAXIMUM_MEMORY_ADDRESS = 0xFFFF  # These scripts only support 16-bit memory addresses.
 MAXIMUM_I2C_ADDRESS = 0b01111111 # 7 bits is the largest possible I2C address, as the least significant bit denotes read (1) or write (0) mode.
 
+# BusPirate Constants
+MAXIMUM_RX_TX_BYTES = 4096       # The BusPirate's write then read command can transfer up to 4096 bytes at a time.
+I2C_SET_SPEED = 0x60             # The BusPirate binary I2C mode command to set the clock speed. The lower 2 bits are the speed code from I2C_SPEEDS.
+I2C_CONFIGURE = 0x40             # The BusPirate binary I2C mode command to configure the peripherals. The lower 4 bits turn on the power, pullups, AUX and CS.
+SERIAL_BAUD_RATE = 115200        # The baud rate of the BusPirate's serial link.
+# The BusPirate binary I2C mode speed code for each of the clock speeds that can be chosen
+I2C_SPEEDS = {"400kHz": 0x03, "100kHz": 0x02, "50kHz": 0x01, "5kHz": 0x00}
+# The frequency in Hz of each of the clock speeds that can be chosen
+I2C_CLOCK_RATES = {"400kHz": 400000, "100kHz": 100000, "50kHz": 50000, "5kHz": 5000}
+
 # Colours for output to terminal (Blender Style)
 class OutputColours:
     PINK = '\033[95m'
@@ -30,11 +40,28 @@ class OutputColours:
 def auto_int(x):
     return int(x, 0)
 
+# Function to set the I2C clock speed of the BusPirate and configure its power output and internal pullup resistors. Both commands are sent in a single serial write and both status
+# bytes are read back in one go, rather than waiting for a round trip to the BusPirate after each one.
+def configure_bus_pirate(busPirate, clockSpeed, enablePullups):
+    # The power output (bit 3) is always turned on, and the internal pullup resistors (bit 2) are only turned on if requested
+    busPirate.port.write(bytes([I2C_SET_SPEED | I2C_SPEEDS[clockSpeed], I2C_CONFIGURE | (1 << 3) | (enablePullups << 2)]))
+
+    # The BusPirate responds with 0x01 for each command it accepts
+    if busPirate.port.read(2) != b"\x01\x01":
+        raise ProtocolError(f"{OutputColours.ERROR}[ERR] The BusPirate did not accept the clock speed and power configuration.{OutputColours.END}")
+
+# Function to work out how long to wait for the BusPirate to reply to a transfer of the given number of bytes. The BusPirate has to clock every byte over I2C (8 bits and an ACK) and
+# send it over its serial link (8 bits, a start bit and a stop bit) before it has replied, which takes several seconds for a full transfer at the slowest clock speeds.
+def serial_timeout(clockSpeed, byteCount):
+    # Allow twice as long as the transfer should take, plus a second for the USB serial link
+    return 1 + 2 * byteCount * (9 / I2C_CLOCK_RATES[clockSpeed] + 10 / SERIAL_BAUD_RATE)
+
 # ------------------------------------------------------------------------------------------------ Argument Parser -------------------------------------------------------------------------------------------------
 # Set up the argument parser to retreive inputs from the user
 parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
 parser.add_argument("-a", "--address",        dest="address",       help="The I2C address of the EEPROM module (Note: not the read or write addresses).",    type=auto_int,  required=False, default=hex(0x50))
 parser.add_argument("-c", "--clock-speed",    dest="clockSpeed",    help="The clock speed to use when communicating with the EEPROM module.",                type=str,  required=False, default="400kHz", choices=["400kHz", "100kHz", "50kHz", "5kHz"])
+parser.add_argument("-P", "--port",           dest="port",          help="The serial port of the BusPirate. Found automatically if not given.",              type=str,  required=False, default=None)
 parser.add_argument("-b", "--bytes-per-page", dest="bytesPerPage",  help="The number of bytes per page listed in the EEPROM datasheet.",                     type=int,  required=True)
 parser.add_argument("-p", "--total-pages",    dest="totalPages",    help="The number of memory pages listed in the EEPROM datasheet.",                       type=int,  required=True)
 parser.add_argument("-o", "--output-file",    dest="outputFile",    help="Path to the dump file that will be created by the program.",                       type=Path, required=False, default="./EEPROM_Dump.hex")
@@ -89,43 +116,59 @@ elif args.outputFile.exists() and args.outputFile.is_dir():
 # ------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
 
 # Create a busPirate object configured to communicate over I2C
-busPirate = I2C()
+# Skip searching for the BusPirate if the user has said which port it is on
+busPirate = I2C(portname = args.port) if args.port else I2C()
 
-# Set the I2C clock speed of the BusPirate
-busPirate.speed = args.clockSpeed
+# A full read burst can take several seconds at the slowest clock speeds, so make sure the serial port doesn't time out part way through one. The read address is sent as well.
+busPirate.port.timeout = serial_timeout(args.clockSpeed, 1 + MAXIMUM_RX_TX_BYTES)
 
-# Configure the BusPirate's power output and internal pullup resistors
-busPirate.configure(power = True, pullup = args.enablePullups)
+# Set the I2C clock speed of the BusPirate, and configure its power output and internal pullup resistors
+configure_bus_pirate(busPirate, args.clockSpeed, args.enablePullups)
 
 # Send a start bit
 busPirate.start()
-# Initialise the output file and a progress bar for the write operation
-with open(args.outputFile, "wb") as dumpFile:
-    with tqdm(total = totalBytes, unit = " bytes") as readProgress:
-        # Start at address 0
-        byteAddress = 0
+# Initialise a progress bar for the read operation
+# Rate limit the progress bar redraws, so that they don't add overhead to every read
+with tqdm(total = totalBytes, unit = " bytes", mininterval = 0.25, miniters = max(1, totalBytes // 200)) as readProgress:
+    # Start at address 0
+    byteAddress = 0
+    # The whole EEPROM fits in memory (16-bit addresses limit it to 64 KiB), so collect the dump in a buffer and write it to the file in one go at the end
+    dumpData = bytearray(totalBytes)
+    # Copy the reads into the buffer through a memoryview, so that a short read raises an error rather than resizing the buffer
+    dumpView = memoryview(dumpData)
+    # Look up the methods used in the loop once, rather than on every iteration
+    busPirateTransfer = busPirate.transfer
+    busPirateWriteThenRead = busPirate.write_then_read
+    updateProgress = readProgress.update
+    
+    # Loop through every available byte in the EEPROM and dump it to a file
+    while (byteAddress < totalBytes):
+        # Set the EEPROM address for a sequential read.
+        busPirateTransfer([WRITE_ADDRESS, ((byteAddress >> 8) & 0xFF), (byteAddress & 0xFF) ])
+
+        # Read the max amount of data, or the remaining data (whichever is smaller). Sequential reads aren't limited to a single page, as the EEPROM's address counter increments
+        # across page boundaries, so read as much as the BusPirate can transfer in one go.
+        rxCount = min(MAXIMUM_RX_TX_BYTES, (totalBytes - byteAddress))
+
+        # The only data to be written is the read address of the EEPROM
+        txData = [READ_ADDRESS]
+        # Write and then read the specified number of bytes
+        rxData = busPirateWriteThenRead(len(txData), rxCount, txData)
+
+        # If the read was successful, store the contents in the dump buffer
+        dumpView[byteAddress:byteAddress + rxCount] = rxData
+
+        # Calculate the next address to read from
+        byteAddress += rxCount
         
-        # Loop through every available byte in the EEPROM and dump it to a file
-        while (byteAddress < totalBytes):
-            # Set the EEPROM address for a sequential read.
-            busPirate.transfer([WRITE_ADDRESS, ((byteAddress >> 8) & 0xFF), (byteAddress & 0xFF) ])
-
-            # Read the max amount of data, or the remaining data (whichever is smaller)
-            rxCount = min(args.bytesPerPage, (totalBytes - byteAddress))
-
-            # The only data to be written is the read address of the EEPROM
-            txData = [READ_ADDRESS]
-            # Write and then read the specified number of bytes
-            rxData = busPirate.write_then_read(len(txData), rxCount, txData)
-
-            # If the read was successful, write the contents to a file
-            dumpFile.write(rxData)
-
-            # Calculate the next address to read from
-            byteAddress += rxCount
-            
-            # Update progress bar
-            readProgress.update(rxCount)
+        # Update progress bar
+        updateProgress(rxCount)
+
+# The output file is only opened once the whole EEPROM has been read, so a dump that fails part way through doesn't leave a partial file behind
+# Use a large write buffer so that the dump is written with as few system calls as possible. The buffer is drained when the file is closed.
+with open(args.outputFile, "wb", buffering = 1024 * 1024) as dumpFile:
+    # Write the complete dump to the file
+    dumpFile.write(dumpData)
 # Send a stop bit
 busPirate.stop()
 
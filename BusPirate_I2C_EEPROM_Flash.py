@@ -4,8 +4,14 @@ import argparse
 # Import Path from Pathlib to handle directories
 from pathlib import Path
 
+# Import time to time out waiting for the EEPROM
+import time
+
+# Import pack to build the BusPirate commands
+from struct import pack
+
 # Import the pyBusPirateLite library
-from pyBusPirateLite.I2C import I2C
+from pyBusPirateLite.I2C import I2C, ProtocolError
 
 # Import the tqdm progress bar library
 from tqdm import tqdm
@@ -13,6 +19,18 @@ from tqdm import tqdm
 # EEPROM Constants
 MAXIMUM_MEMORY_ADDRESS = 0xFFFF  # These scripts only support 16-bit memory addresses.
 MAXIMUM_I2C_ADDRESS = 0b01111111 # 7 bits is the largest possible I2C address, as the least significant bit denotes read (1) or write (0) mode.
+MAXIMUM_WRITE_TIME = 0.1         # Time in seconds to wait for a page write to finish. Covers the write cycle time (tWR, usually 5-10 ms) and round trips of up to 16 ms.
+
+# BusPirate Constants
+MAXIMUM_RX_TX_BYTES = 4096       # The BusPirate's write then read command can transfer up to 4096 bytes at a time.
+I2C_WRITE_THEN_READ = 0x08       # The BusPirate binary I2C mode command to write then read data.
+I2C_SET_SPEED = 0x60             # The BusPirate binary I2C mode command to set the clock speed. The lower 2 bits are the speed code from I2C_SPEEDS.
+I2C_CONFIGURE = 0x40             # The BusPirate binary I2C mode command to configure the peripherals. The lower 4 bits turn on the power, pullups, AUX and CS.
+SERIAL_BAUD_RATE = 115200        # The baud rate of the BusPirate's serial link.
+# The BusPirate binary I2C mode speed code for each of the clock speeds that can be chosen
+I2C_SPEEDS = {"400kHz": 0x03, "100kHz": 0x02, "50kHz": 0x01, "5kHz": 0x00}
+# The frequency in Hz of each of the clock speeds that can be chosen
+I2C_CLOCK_RATES = {"400kHz": 400000, "100kHz": 100000, "50kHz": 50000, "5kHz": 5000}
 
 # Colours for output to terminal (Blender Style)
 class OutputColours:
@@ -30,143 +48,292 @@ class OutputColours:
 def auto_int(x):
     return int(x, 0)
 
-# ------------------------------------------------------------------------------------------------ Argument Parser -------------------------------------------------------------------------------------------------
-# Set up the argument parser to retreive inputs from the user
-parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
-parser.add_argument("-a", "--address",        dest="address",       help="The I2C address of the EEPROM module (Note: not the read or write addresses).",    type=auto_int,  required=False, default=hex(0x50))
-parser.add_argument("-c", "--clock-speed",    dest="clockSpeed",    help="The clock speed to use when communicating with the EEPROM module.",                type=str,  required=False, default="400kHz", choices=["400kHz", "100kHz", "50kHz", "5kHz"])
-parser.add_argument("-b", "--bytes-per-page", dest="bytesPerPage",  help="The number of bytes per page listed in the EEPROM datasheet.",                     type=int,  required=True)
-parser.add_argument("-p", "--total-pages",    dest="totalPages",    help="The number of memory pages listed in the EEPROM datasheet.",                       type=int,  required=True)
-parser.add_argument("-i", "--input-file",     dest="inputFile",     help="Path to the dump file that will be used to flash to the EEPROM.",                  type=Path, required=True)
-parser.add_argument("-e", "--enable-pullups", dest="enablePullups", help="Enable the internal pullup resistors in the BusPirate. Disabled by default.",      action="store_true")
-parser.add_argument("-v", "--verbose",        dest="verbose",       help="Print verbose messages.",                                                          action="store_true")
-
-# Parse the user inputs using the argument parser
-args = parser.parse_args()
-# ------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
-
-# ------------------------------------------------------------------------------------------------ Input Valudation ------------------------------------------------------------------------------------------------
-# Check that a valid I2C address has been provided
-if args.address > MAXIMUM_I2C_ADDRESS:
-    raise ValueError(f"{OutputColours.ERROR}[ERR] The maximum I2C address should be {hex(MAXIMUM_I2C_ADDRESS)}, but {hex(args.address)} was provided.{OutputColours.END}")
-
-# Convert the I2C address to a read and write address. The I2C address is the 7 most significant bits of the address, as the least significant bit denotes read (1) or write (0) mode.
-READ_ADDRESS = (args.address << 1) | 0b00000001   # The EEPROM read address is the I2C address but bit shifted and with a 1 in the LSB
-WRITE_ADDRESS = (args.address << 1) & 0b11111110  # The EEPROM write address is the I2C address but bit shifted and with a 0 in the LSB
-
-# Calculate the total number of bytes to generate
-totalBytes = args.bytesPerPage * args.totalPages
-
-# Ensure that the specified file can be writted to a device with 16-bit addresses, as this is what the other scripts here support.
-if totalBytes > MAXIMUM_MEMORY_ADDRESS:
-    raise ValueError(f"{OutputColours.ERROR}[ERR] These scripts can operate with up to 16-bit memory addresses. The maximum possible address is {MAXIMUM_MEMORY_ADDRESS}, but up to address {totalBytes} was "
-                     f"requested. Consider lowering the pages (-p) value.{OutputColours.END}")
-
-# Ensure the input file exists and is a valid file
-if not args.inputFile.exists():
-    # If the file does not exist, report the error to the user
-    raise SystemExit(f"{OutputColours.ERROR}[ERR] The specified input file does not exist.{OutputColours.END}")
-elif args.inputFile.exists() and not args.inputFile.is_file():
-    # In this case, it appears as if the input specified is not a file, report the error to the user
-    raise SystemExit(f"{OutputColours.ERROR}[ERR] The specified input does not appear to be a valid file.{OutputColours.END}")
-
-# Get the size of the input file in bytes
-fileSize = args.inputFile.stat().st_size
-
-# Check that the file will fit on the EEPROM
-if fileSize > totalBytes:
-    raise IndexError("Input file size is larger than the specified EEPROM size.")
-# ------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
-
-# Create a busPirate object configured to communicate over I2C
-busPirate = I2C()
-
-# Set the I2C clock speed of the BusPirate
-busPirate.speed = args.clockSpeed
-
-# Configure the BusPirate's power output and internal pullup resistors
-busPirate.configure(power = True, pullup = args.enablePullups)
-
-# Send a start bit
-busPirate.start()
-print(f"{OutputColours.INFO}[INFO] Flashing EEPROM:{OutputColours.END}")
-# Initialise the input file and a progress bar for the write operation
-with open(args.inputFile, "rb") as dumpFile:
-    with tqdm(total = fileSize, unit = " bytes") as writeProgress:
+# Function to set the I2C clock speed of the BusPirate and configure its power output and internal pullup resistors. Both commands are sent in a single serial write and both status
+# bytes are read back in one go, rather than waiting for a round trip to the BusPirate after each one.
+def configure_bus_pirate(busPirate, clockSpeed, enablePullups):
+    # The power output (bit 3) is always turned on, and the internal pullup resistors (bit 2) are only turned on if requested
+    busPirate.port.write(bytes([I2C_SET_SPEED | I2C_SPEEDS[clockSpeed], I2C_CONFIGURE | (1 << 3) | (enablePullups << 2)]))
+
+    # The BusPirate responds with 0x01 for each command it accepts
+    if busPirate.port.read(2) != b"\x01\x01":
+        raise ProtocolError(f"{OutputColours.ERROR}[ERR] The BusPirate did not accept the clock speed and power configuration.{OutputColours.END}")
+
+# Function to work out how long to wait for the BusPirate to reply to a transfer of the given number of bytes. The BusPirate has to clock every byte over I2C (8 bits and an ACK) and
+# send it over its serial link (8 bits, a start bit and a stop bit) before it has replied, which takes several seconds for a full transfer at the slowest clock speeds.
+def serial_timeout(clockSpeed, byteCount):
+    # Allow twice as long as the transfer should take, plus a second for the USB serial link
+    return 1 + 2 * byteCount * (9 / I2C_CLOCK_RATES[clockSpeed] + 10 / SERIAL_BAUD_RATE)
+
+# Function to find the latency timer of the BusPirate's FTDI USB serial chip. This is only there on Linux, and only for FTDI serial ports (/dev/ttyUSB*).
+def latency_timer(busPirate):
+    return Path("/sys/bus/usb-serial/devices") / Path(busPirate.port.port).resolve().name / "latency_timer"
+
+# Function to lower the latency timer of the BusPirate's FTDI USB serial chip from its default of 16 ms to 1 ms. The FTDI chip holds on to short responses until the timer runs out,
+# so otherwise every round trip to the BusPirate can take up to 16 ms. Returns the old value so that restore_latency_timer() can put it back, or None if it couldn't be changed.
+def lower_latency_timer(busPirate):
+    try:
+        oldLatency = latency_timer(busPirate).read_text()
+        latency_timer(busPirate).write_text("1")
+    except OSError:
+        print(f"{OutputColours.WARNING}[WARN] Could not lower the USB serial latency timer at {latency_timer(busPirate)}, round trips to the BusPirate may be slower. This only works "
+              f"for FTDI serial ports on Linux, and usually needs root.{OutputColours.END}")
+        return None
+
+    return oldLatency
+
+# Function to put the latency timer back to the value it had before lower_latency_timer() changed it. The timer is a setting for the whole USB serial chip, not just this program.
+def restore_latency_timer(busPirate, oldLatency):
+    try:
+        latency_timer(busPirate).write_text(oldLatency)
+    except OSError:
+        print(f"{OutputColours.WARNING}[WARN] Could not restore the USB serial latency timer at {latency_timer(busPirate)} to {oldLatency.strip()} ms.{OutputColours.END}")
+
+# Function to build the BusPirate's write then read command to write data to the EEPROM without reading anything back. The data can be any bytes-like object or list of ints.
+def write_command(txData):
+    # The command is followed by the big-endian 16-bit number of bytes to write and to read
+    return pack(">BHH", I2C_WRITE_THEN_READ, len(txData), 0x0000) + bytes(txData)
+
+# Function to write data to the EEPROM without reading anything back. The command is sent as a single serial write, and then only the status byte is read back.
+def i2c_write(busPirate, txData):
+    busPirate.port.write(write_command(txData))
+
+    # The BusPirate responds with 0x01 if every byte was ACKed, or 0x00 if the EEPROM sent a NACK
+    if busPirate.port.read(1) != b"\x01":
+        raise ProtocolError(f"{OutputColours.ERROR}[ERR] The EEPROM did not acknowledge the write.{OutputColours.END}")
+
+# Function to send a write command to the EEPROM, and keep sending it until the EEPROM ACKs. The EEPROM doesn't respond to its address while it is still busy writing a page, and
+# nothing is written until it does, so sending the command again is harmless. This only waits as long as the write actually takes, rather than the worst case write time.
+def retry_write(busPirate, command, maxTime = MAXIMUM_WRITE_TIME):
+    timeout = time.monotonic() + maxTime
+    while True:
+        busPirate.port.write(command)
+
+        # The BusPirate responds with 0x01 if every byte was ACKed, or 0x00 if the EEPROM sent a NACK
+        if busPirate.port.read(1) == b"\x01":
+            return
+
+        # If the EEPROM still hasn't responded after the maximum write time, something has gone wrong
+        if time.monotonic() > timeout:
+            raise ProtocolError(f"{OutputColours.ERROR}[ERR] The EEPROM did not finish writing within {maxTime * 1000:.0f} ms.{OutputColours.END}")
+
+# Function to wait for the EEPROM to finish writing a page, by sending it just its write address (which writes nothing) until it ACKs
+def ack_poll(busPirate, writeAddress, maxTime = MAXIMUM_WRITE_TIME):
+    retry_write(busPirate, write_command([writeAddress]), maxTime)
+
+# Function to read data from the EEPROM, starting at the given address. This takes two round trips to the BusPirate, and each command is only sent once the BusPirate has replied
+# to the one before it, as the BusPirate doesn't read its serial port while it is busy on the I2C bus and can only buffer a few bytes.
+def read_eeprom(busPirate, byteAddress, rxCount, writeAddress, readAddress):
+    # Set the EEPROM's address counter with a write of just the big-endian 16-bit byte position. No data is written, so this doesn't start a write cycle.
+    i2c_write(busPirate, pack(">BH", writeAddress, byteAddress))
+
+    # Read the data. The write then read command only writes the read address, and responds with 0x01 followed by the data.
+    busPirate.port.write(pack(">BHHB", I2C_WRITE_THEN_READ, 0x0001, rxCount, readAddress))
+    response = busPirate.port.read(1 + rxCount)
+    if response[:1] != b"\x01" or len(response) != 1 + rxCount:
+        raise ProtocolError(f"{OutputColours.ERROR}[ERR] The EEPROM did not respond to the read.{OutputColours.END}")
+
+    return response[1:]
+
+# Function to build the start of the BusPirate's write command for every page up front: the write then read command and its lengths, the write address of the EEPROM and the
+# byte position to start writing. These are all known before anything is written, and even a 64 KB EEPROM only has a few thousand pages, so none of it needs working out per page.
+def page_headers(totalBytes, bytesPerPage, writeAddress):
+    pageHeaders = []
+    for byteAddress in range(0, totalBytes, bytesPerPage):
+        # The number of bytes to write includes the write address and the byte position, and nothing is read back
+        pageHeaders.append(pack(">BHHBH", I2C_WRITE_THEN_READ, 3 + min(bytesPerPage, totalBytes - byteAddress), 0x0000, writeAddress, byteAddress))
+    return pageHeaders
+
+# Function to write pages to the EEPROM. Each page is a tuple of its header from page_headers() and the data to write to it. Each page is sent to the BusPirate in a single serial
+# write, and nothing else is sent until its status byte has come back. The BusPirate doesn't read its serial port while it is busy on the I2C bus and can only buffer a few bytes, so
+# anything sent behind a command that is still running can be lost.
+def write_pages(busPirate, pages, bytesPerPage, writeAddress, writeProgress):
+    # Allocate a single buffer for a page write, which is reused for every page. It fits the 8 byte header from page_headers() and a full page of data.
+    frameData = bytearray(8 + bytesPerPage)
+    frameView = memoryview(frameData)
+
+    for pageHeader, pageData in pages:
+        # Copy the header and the data into the frame buffer, rather than joining them into a new bytes object for every page
+        frameBytes = len(pageHeader) + len(pageData)
+        frameView[:len(pageHeader)] = pageHeader
+        frameView[len(pageHeader):frameBytes] = pageData
+
+        # The EEPROM doesn't ACK the page while it is still writing the last one, so the page write doubles as the ACK poll. By the time the page has been sent the last one has
+        # usually finished writing, so this rarely needs more than one round trip.
+        retry_write(busPirate, frameView[:frameBytes])
+
+        # Update progress bar
+        writeProgress.update(len(pageData))
+
+    # Wait for the last page to finish writing, so that the EEPROM is ready to be read
+    ack_poll(busPirate, writeAddress)
+
+# Function to flash the contents of the input file to the EEPROM, and then verify it by reading it back. Pages that are all 0xFF in the input file aren't written if skipBlank is
+# set, and pages that already match the EEPROM aren't written if diffPages is set. Returns the address of the first byte that didn't match, or None if the verification passed.
+def flash_eeprom(busPirate, inputFile, fileSize, bytesPerPage, writeAddress, readAddress, skipBlank, diffPages):
+    # Load the whole input file, so that the pages and the verify reads can be sliced out of it without copying. These scripts only support up to 64 KB.
+    with open(inputFile, "rb") as dumpFile:
+        fileData = dumpFile.read()
+    fileView = memoryview(fileData)
+
+    # Send a start bit
+    busPirate.start()
+    print(f"{OutputColours.INFO}[INFO] Flashing EEPROM:{OutputColours.END}")
+    # Initialise a progress bar for the write operation
+    # Rate limit the progress bar redraws, so that they don't add overhead to every page
+    with tqdm(total = fileSize, unit = " bytes", mininterval = 0.5, miniters = 1024) as writeProgress:
         # Start at address 0
         byteAddress = 0
-        # Seek to the correct position in the file to begin reading from
-        dumpFile.seek(byteAddress)
-        
-        # Loop through every available byte in the input file and flash it from the file
-        while (byteAddress < fileSize):
+        # Keep track of the pages that need to be written
+        pages = []
+
+        # If the user has asked to only write pages that are different to what is already on the EEPROM, read the whole EEPROM once before anything is written. Reads aren't
+        # limited to a page at a time, so this takes a couple of round trips per 4096 bytes rather than per page.
+        if diffPages:
+            # Nothing has been written yet, so the EEPROM is always ready to be read
+            eepromData = bytearray()
+            for chunkAddress in range(0, fileSize, MAXIMUM_RX_TX_BYTES):
+                eepromData += read_eeprom(busPirate, chunkAddress, min(MAXIMUM_RX_TX_BYTES, (fileSize - chunkAddress)), writeAddress, readAddress)
+            eepromView = memoryview(eepromData)
+    
+        # Loop through every page in the input file and work out which ones need to be flashed
+        for pageHeader in page_headers(fileSize, bytesPerPage, writeAddress):
             # Read the max amount of data, or the remaining data (whichever is smaller)
-            txCount = min(args.bytesPerPage, (fileSize - byteAddress))
+            txCount = min(bytesPerPage, (fileSize - byteAddress))
 
-            # Load the correct number of bytes for the tx
-            fileData = list(dumpFile.read(txCount))
+            # A page that is all 0xFF is already in the erased state, so it can be skipped if the user has said the EEPROM is blank. The verify still checks these pages.
+            writePage = not (skipBlank and fileData.count(0xFF, byteAddress, byteAddress + txCount) == txCount)
 
-            # Transmit the write address of the EEPROM, along with the byte position to start writing and the data to write.
-            txData = [WRITE_ADDRESS, ((byteAddress >> 8) & 0xFF), (byteAddress & 0xFF)] + fileData
+            # Pages that already match what was read from the EEPROM don't need writing
+            if writePage and diffPages:
+                writePage = eepromView[byteAddress:byteAddress + txCount] != fileView[byteAddress:byteAddress + txCount]
 
-            # Write and then read the specified number of bytes
-            rxData = busPirate.write_then_read(len(txData), 0, txData)
+            if writePage:
+                pages.append((pageHeader, fileView[byteAddress:byteAddress + txCount]))
+            else:
+                # Update progress bar for the pages that don't need writing
+                writeProgress.update(txCount)
 
             # Calculate the next address to flash
             byteAddress += txCount
-            
-            # Update progress bar
-            writeProgress.update(txCount)
-# Send a stop bit
-busPirate.stop()
-
-# Send a start bit
-busPirate.start()
-verifyError = False
-print(f"{OutputColours.INFO}[INFO] Verifying flash operation:{OutputColours.END}")
-# Initialise the input file and a progress bar for the verify operation
-with open(args.inputFile, "rb") as dumpFile:
-    with tqdm(total = fileSize, unit = " bytes") as writeProgress:
-        # Start at address 0
-        byteAddress = 0
-        # Seek to the correct position in the file to begin reading from
-        dumpFile.seek(byteAddress)
-        
-        # Loop through every available byte in the input file and compare it with the EEPROM contents
-        while (byteAddress < fileSize):
-            # Read the max amount of data, or the remaining data (whichever is smaller)
-            verifyCount = min(args.bytesPerPage, (fileSize - byteAddress))
 
-            # Load the correct number of bytes for the tx
-            fileData = dumpFile.read(verifyCount)
+        # Write the pages to the EEPROM
+        write_pages(busPirate, pages, bytesPerPage, writeAddress, writeProgress)
+    # Send a stop bit
+    busPirate.stop()
 
-            # Set the EEPROM address for a sequential read.
-            busPirate.transfer([WRITE_ADDRESS, ((byteAddress >> 8) & 0xFF), (byteAddress & 0xFF) ])
-            
-            # The only data to be written is the read address of the EEPROM
-            txData = [READ_ADDRESS]
+    # Send a start bit
+    busPirate.start()
+    verifyErrorAddress = None
+    print(f"{OutputColours.INFO}[INFO] Verifying flash operation:{OutputColours.END}")
+    # Initialise a progress bar for the verify operation
+    # Rate limit the progress bar redraws, so that they don't add overhead to every page
+    with tqdm(total = fileSize, unit = " bytes", mininterval = 0.5, miniters = 1024) as verifyProgress:
+        # Loop through every available byte in the input file and compare it with the EEPROM contents. Reading isn't limited to a page at a time, so read as much as the BusPirate
+        # can transfer at once.
+        for byteAddress in range(0, fileSize, MAXIMUM_RX_TX_BYTES):
+            # Read the max amount of data, or the remaining data (whichever is smaller)
+            verifyCount = min(MAXIMUM_RX_TX_BYTES, (fileSize - byteAddress))
 
-            # Write and then read the specified number of bytes
-            rxData = busPirate.write_then_read(len(txData), verifyCount, txData)
-            
+            # Read the same number of bytes back from the EEPROM
+            rxData = read_eeprom(busPirate, byteAddress, verifyCount, writeAddress, readAddress)
+        
             # Compare the read data and the file data
-            if bytes(fileData) != rxData:
-                verifyError = True
+            if fileView[byteAddress:byteAddress + verifyCount] != rxData:
+                # Find the first byte that doesn't match, so that the user knows where the verification failed. This only runs once, so it doesn't need to be quick.
+                verifyErrorAddress = byteAddress + next(i for i in range(verifyCount) if fileData[byteAddress + i] != rxData[i])
                 break
-
-            # Calculate the next address to verify
-            byteAddress += verifyCount
-            
+        
             # Update progress bar
-            writeProgress.update(verifyCount)
-# Send a stop bit
-busPirate.stop()
-
-# Reset the BusPirate to disable all outputs and reset it to "HiZ" mode. Should also free up the COM port.
-busPirate.hw_reset()
-
-# Output info to the user
-if verifyError:
-    print(f"{OutputColours.ERROR}[ERR] Verification failed.{OutputColours.END}")
-else:
-    print(f"{OutputColours.INFO}[INFO] EEPROM flashed successfully.{OutputColours.END}")
+            verifyProgress.update(verifyCount)
+    # Send a stop bit
+    busPirate.stop()
+
+    return verifyErrorAddress
+
+# Function to read and check the user's inputs, then flash the EEPROM and verify it
+def main():
+    # -------------------------------------------------------------------------------------------- Argument Parser -------------------------------------------------------------------------------------------------
+    # Set up the argument parser to retreive inputs from the user
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("-a", "--address",        dest="address",       help="The I2C address of the EEPROM module (Note: not the read or write addresses).",    type=auto_int,  required=False, default=hex(0x50))
+    parser.add_argument("-c", "--clock-speed",    dest="clockSpeed",    help="The clock speed to use when communicating with the EEPROM module.",                type=str,  required=False, default="400kHz", choices=["400kHz", "100kHz", "50kHz", "5kHz"])
+    parser.add_argument("-P", "--port",           dest="port",          help="The serial port of the BusPirate. Found automatically if not given.",              type=str,  required=False, default=None)
+    parser.add_argument("-b", "--bytes-per-page", dest="bytesPerPage",  help="The number of bytes per page listed in the EEPROM datasheet.",                     type=int,  required=True)
+    parser.add_argument("-p", "--total-pages",    dest="totalPages",    help="The number of memory pages listed in the EEPROM datasheet.",                       type=int,  required=True)
+    parser.add_argument("-i", "--input-file",     dest="inputFile",     help="Path to the dump file that will be used to flash to the EEPROM.",                  type=Path, required=True)
+    parser.add_argument("-e", "--enable-pullups", dest="enablePullups", help="Enable the internal pullup resistors in the BusPirate. Disabled by default.",      action="store_true")
+    parser.add_argument("-B", "--skip-blank",     dest="skipBlank",     help="Don't write pages that are all 0xFF. Only for EEPROMs already wiped with FF.",     action="store_true")
+    parser.add_argument("-d", "--diff",           dest="diffPages",     help="Only write pages that are different to what is already on the EEPROM.",            action="store_true")
+    parser.add_argument("-l", "--low-latency",    dest="lowLatency",    help="Lower the USB serial latency timer to 1 ms while running. Linux FTDI only.",       action="store_true")
+    parser.add_argument("-v", "--verbose",        dest="verbose",       help="Print verbose messages.",                                                          action="store_true")
+
+    # Parse the user inputs using the argument parser
+    args = parser.parse_args()
+    # --------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    # -------------------------------------------------------------------------------------------- Input Valudation ------------------------------------------------------------------------------------------------
+    # Check that a valid I2C address has been provided
+    if args.address > MAXIMUM_I2C_ADDRESS:
+        raise ValueError(f"{OutputColours.ERROR}[ERR] The maximum I2C address should be {hex(MAXIMUM_I2C_ADDRESS)}, but {hex(args.address)} was provided.{OutputColours.END}")
+
+    # Convert the I2C address to a read and write address. The I2C address is the 7 most significant bits of the address, as the least significant bit denotes read (1) or write (0) mode.
+    READ_ADDRESS = (args.address << 1) | 0b00000001   # The EEPROM read address is the I2C address but bit shifted and with a 1 in the LSB
+    WRITE_ADDRESS = (args.address << 1) & 0b11111110  # The EEPROM write address is the I2C address but bit shifted and with a 0 in the LSB
+
+    # Calculate the total number of bytes to generate
+    totalBytes = args.bytesPerPage * args.totalPages
+
+    # Ensure that the specified file can be writted to a device with 16-bit addresses, as this is what the other scripts here support.
+    if totalBytes > MAXIMUM_MEMORY_ADDRESS:
+        raise ValueError(f"{OutputColours.ERROR}[ERR] These scripts can operate with up to 16-bit memory addresses. The maximum possible address is {MAXIMUM_MEMORY_ADDRESS}, but up to address {totalBytes} was "
+                         f"requested. Consider lowering the pages (-p) value.{OutputColours.END}")
+
+    # Ensure the input file exists and is a valid file
+    if not args.inputFile.exists():
+        # If the file does not exist, report the error to the user
+        raise SystemExit(f"{OutputColours.ERROR}[ERR] The specified input file does not exist.{OutputColours.END}")
+    elif args.inputFile.exists() and not args.inputFile.is_file():
+        # In this case, it appears as if the input specified is not a file, report the error to the user
+        raise SystemExit(f"{OutputColours.ERROR}[ERR] The specified input does not appear to be a valid file.{OutputColours.END}")
+
+    # Get the size of the input file in bytes
+    fileSize = args.inputFile.stat().st_size
+
+    # Check that the file will fit on the EEPROM
+    if fileSize > totalBytes:
+        raise IndexError("Input file size is larger than the specified EEPROM size.")
+    # --------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    # Create a busPirate object configured to communicate over I2C
+    # Skip searching for the BusPirate if the user has said which port it is on
+    busPirate = I2C(portname = args.port) if args.port else I2C()
+
+    # Make round trips to the BusPirate as quick as possible, if the user has asked for it
+    oldLatency = lower_latency_timer(busPirate) if args.lowLatency else None
+
+    try:
+        # A full verify read can take several seconds at the slowest clock speeds, so make sure the serial port doesn't time out part way through one. The read address is sent as well.
+        busPirate.port.timeout = serial_timeout(args.clockSpeed, 1 + MAXIMUM_RX_TX_BYTES)
+
+        # Set the I2C clock speed of the BusPirate, and configure its power output and internal pullup resistors
+        configure_bus_pirate(busPirate, args.clockSpeed, args.enablePullups)
+
+        # Flash and verify the EEPROM
+        verifyErrorAddress = flash_eeprom(busPirate, args.inputFile, fileSize, args.bytesPerPage, WRITE_ADDRESS, READ_ADDRESS, args.skipBlank, args.diffPages)
+
+        # Reset the BusPirate to disable all outputs and reset it to "HiZ" mode. Should also free up the COM port.
+        busPirate.hw_reset()
+    finally:
+        # Put the latency timer back as it was, even if something went wrong, as other programs using the serial port will expect it
+        if oldLatency != None:
+            restore_latency_timer(busPirate, oldLatency)
+
+    # Output info to the user
+    if verifyErrorAddress != None:
+        print(f"{OutputColours.ERROR}[ERR] Verification failed at address {hex(verifyErrorAddress)}.{OutputColours.END}")
+    else:
+        print(f"{OutputColours.INFO}[INFO] EEPROM flashed successfully.{OutputColours.END}")
+
+# Only talk to the BusPirate when run as a script, rather than when imported
+if __name__ == "__main__":
+    main()
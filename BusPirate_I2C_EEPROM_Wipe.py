@@ -1,8 +1,22 @@
+# Wipe an I2C EEPROM through a BusPirate by filling it with a repeating hex string, then read it back to verify it.
+# The run time is set by the link to the EEPROM, not by Python: the BusPirate's 115200 baud serial link carries around 11 KB/s, and the EEPROM needs a few ms to write each page, while
+# the Python work per page takes microseconds. Speed-ups should cut round trips to the BusPirate and time spent waiting for the EEPROM before touching the Python code. Profile a run
+# first to check (see the end of --help).
+
 # Import argparse to handle command line arguments and help texts
 import argparse
 
+# Import Path to find the latency timer of the serial port
+from pathlib import Path
+
+# Import time to time out waiting for the EEPROM
+import time
+
+# Import pack to build the BusPirate commands
+from struct import pack
+
 # Import the pyBusPirateLite library
-from pyBusPirateLite.I2C import I2C
+from pyBusPirateLite.I2C import I2C, ProtocolError
 
 # Import the tqdm progress bar library
 from tqdm import tqdm
@@ -10,6 +24,18 @@ from tqdm import tqdm
 # EEPROM Constants
 MAXIMUM_MEMORY_ADDRESS = 0xFFFF  # These scripts only support 16-bit memory addresses.
 MAXIMUM_I2C_ADDRESS = 0b01111111 # 7 bits is the largest possible I2C address, as the least significant bit denotes read (1) or write (0) mode.
+MAXIMUM_WRITE_TIME = 0.1         # Time in seconds to wait for a page write to finish. Covers the write cycle time (tWR, usually 5-10 ms) and round trips of up to 16 ms.
+
+# BusPirate Constants
+MAXIMUM_RX_TX_BYTES = 4096       # The BusPirate's write then read command can transfer up to 4096 bytes at a time.
+I2C_WRITE_THEN_READ = 0x08       # The BusPirate binary I2C mode command to write then read data.
+I2C_SET_SPEED = 0x60             # The BusPirate binary I2C mode command to set the clock speed. The lower 2 bits are the speed code from I2C_SPEEDS.
+I2C_CONFIGURE = 0x40             # The BusPirate binary I2C mode command to configure the peripherals. The lower 4 bits turn on the power, pullups, AUX and CS.
+SERIAL_BAUD_RATE = 115200        # The baud rate of the BusPirate's serial link.
+# The BusPirate binary I2C mode speed code for each of the clock speeds that can be chosen
+I2C_SPEEDS = {"400kHz": 0x03, "100kHz": 0x02, "50kHz": 0x01, "5kHz": 0x00}
+# The frequency in Hz of each of the clock speeds that can be chosen
+I2C_CLOCK_RATES = {"400kHz": 400000, "100kHz": 100000, "50kHz": 50000, "5kHz": 5000}
 
 # Colours for output to terminal (Blender Style)
 class OutputColours:
@@ -27,185 +53,270 @@ class OutputColours:
 def auto_int(x):
     return int(x, 0)
 
-# ------------------------------------------------------------------------------------------------ Argument Parser -------------------------------------------------------------------------------------------------
-# Set up the argument parser to retreive inputs from the user
-parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
-parser.add_argument("-a", "--address",        dest="address",       help="The I2C address of the EEPROM module (Note: not the read or write addresses).",    type=auto_int,  required=False, default=hex(0x50))
-parser.add_argument("-c", "--clock-speed",    dest="clockSpeed",    help="The clock speed to use when communicating with the EEPROM module.",                type=str,  required=False, default="400kHz", choices=["400kHz", "100kHz", "50kHz", "5kHz"])
-parser.add_argument("-b", "--bytes-per-page", dest="bytesPerPage",  help="The number of bytes per page listed in the EEPROM datasheet.",                     type=int,  required=True)
-parser.add_argument("-p", "--total-pages",    dest="totalPages",    help="The number of memory pages listed in the EEPROM datasheet.",                       type=int,  required=True)
-parser.add_argument("-s", "--hexstring",      dest="hexString",     help="A string of hex characters that will be used to output to wipe the EEPROM.",       type=str,  required=False, default="00")
-parser.add_argument("-e", "--enable-pullups", dest="enablePullups", help="Enable the internal pullup resistors in the BusPirate. Disabled by default.",      action="store_true")
-parser.add_argument("-v", "--verbose",        dest="verbose",       help="Print verbose messages.",                                                          action="store_true")
-
-# Parse the user inputs using the argument parser
-args = parser.parse_args()
-# ------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
-
-# ------------------------------------------------------------------------------------------------ Input Valudation ------------------------------------------------------------------------------------------------
-# Check that a valid I2C address has been provided
-if args.address > MAXIMUM_I2C_ADDRESS:
-    raise ValueError(f"{OutputColours.ERROR}[ERR] The maximum I2C address should be {hex(MAXIMUM_I2C_ADDRESS)}, but {hex(args.address)} was provided.{OutputColours.END}")
-
-# Convert the I2C address to a read and write address. The I2C address is the 7 most significant bits of the address, as the least significant bit denotes read (1) or write (0) mode.
-READ_ADDRESS = (args.address << 1) | 0b00000001   # The EEPROM read address is the I2C address but bit shifted and with a 1 in the LSB
-WRITE_ADDRESS = (args.address << 1) & 0b11111110  # The EEPROM write address is the I2C address but bit shifted and with a 0 in the LSB
-
-# Calculate the total number of bytes to generate
-totalBytes = args.bytesPerPage * args.totalPages
-
-# Ensure that the specified file can be writted to a device with 16-bit addresses, as this is what the other scripts here support.
-if totalBytes > MAXIMUM_MEMORY_ADDRESS:
-    raise ValueError(f"{OutputColours.ERROR}[ERR] These scripts can operate with up to 16-bit memory addresses. The maximum possible address is {MAXIMUM_MEMORY_ADDRESS}, but up to address {totalBytes} was "
-                     f"requested. Consider lowering the pages (-p) value.{OutputColours.END}")
-
-# Convert the hex string into an immutable array of bytes
-wiperString = bytes.fromhex(args.hexString)
-wiperStringBytes = len(wiperString)
-# ------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
-
-# Create a busPirate object configured to communicate over I2C
-busPirate = I2C()
-
-# Set the I2C clock speed of the BusPirate
-busPirate.speed = args.clockSpeed
-
-# Configure the BusPirate's power output and internal pullup resistors
-busPirate.configure(power = True, pullup = args.enablePullups)
-
-# Send a start bit
-busPirate.start()
-print(f"{OutputColours.INFO}[INFO] Wiping EEPROM:{OutputColours.END}")
-# Initialise a progress bar for the write operation
-with tqdm(total = totalBytes, unit = " bytes") as writeProgress:
-    # Start at address 0
-    byteAddress = 0
-    # If the string length doesn't fit perfectly into a memory page, we need to keep track of which character the last page ended on
-    wiperStringStart = 0
-    
-    # Loop through every available byte on the EEPROM and write to it
-    while (byteAddress < totalBytes):
-        # Read the max amount of data, or the remaining data (whichever is smaller)
-        bytesToWrite = min(args.bytesPerPage, (totalBytes - byteAddress))
-
-        # Load the correct number of bytes for the tx
-        if bytesToWrite > wiperStringBytes:
-            # Calculate how many characters would be filled with partial data in this page
-            partialWiperStringBytes = bytesToWrite % wiperStringBytes
-            # Calculate how many complete wiper strings will fit in the page
-            completeWiperStrings = int((bytesToWrite - partialWiperStringBytes) / wiperStringBytes)
-            # Fill as much of the page with completed wiper strings as possible
-            wiperData = list(wiperString[wiperStringStart:] + wiperString[:wiperStringStart]) * completeWiperStrings
-            # Fill the remainder of the page with a partial string
-            wiperStringEnd = wiperStringStart + partialWiperStringBytes
-            if wiperStringEnd > wiperStringBytes:
-                wiperStringEnd -= wiperStringBytes
-                wiperData += list(wiperString[wiperStringStart:] + wiperString[:wiperStringEnd])
-            else:
-                wiperData += list(wiperString[wiperStringStart:wiperStringEnd])
-            # Keep track of where the string needs to start and end on the next page
-            wiperStringStart += partialWiperStringBytes
-            # Ensure the tracker variables stay within the range of the string
-            while wiperStringStart > wiperStringBytes:
-                wiperStringStart -= wiperStringBytes
-            
-        else:
-            wiperStringEnd = wiperStringStart + bytesToWrite
-            if wiperStringEnd > wiperStringBytes:
-                wiperStringEnd -= wiperStringBytes
-                wiperData += list(wiperString[wiperStringStart:] + wiperString[:wiperStringEnd])
-            else:
-                wiperData += list(wiperString[wiperStringStart:wiperStringEnd])
-            wiperData = list(wiperString[0:bytesToWrite])
-
-        # Transmit the write address of the EEPROM, along with the byte position to start writing and the data to write.
-        txData = [WRITE_ADDRESS, ((byteAddress >> 8) & 0xFF), (byteAddress & 0xFF)] + wiperData
-
-        # Write and then read the specified number of bytes
-        rxData = busPirate.write_then_read(len(txData), 0, txData)
-
-        # Calculate the next address to wipe
-        byteAddress += bytesToWrite
-        
+# Function to set the I2C clock speed of the BusPirate and configure its power output and internal pullup resistors. Both commands are sent in a single serial write and both status
+# bytes are read back in one go, rather than waiting for a round trip to the BusPirate after each one.
+def configure_bus_pirate(busPirate, clockSpeed, enablePullups):
+    # The power output (bit 3) is always turned on, and the internal pullup resistors (bit 2) are only turned on if requested
+    busPirate.port.write(bytes([I2C_SET_SPEED | I2C_SPEEDS[clockSpeed], I2C_CONFIGURE | (1 << 3) | (enablePullups << 2)]))
+
+    # The BusPirate responds with 0x01 for each command it accepts
+    if busPirate.port.read(2) != b"\x01\x01":
+        raise ProtocolError(f"{OutputColours.ERROR}[ERR] The BusPirate did not accept the clock speed and power configuration.{OutputColours.END}")
+
+# Function to work out how long to wait for the BusPirate to reply to a transfer of the given number of bytes. The BusPirate has to clock every byte over I2C (8 bits and an ACK) and
+# send it over its serial link (8 bits, a start bit and a stop bit) before it has replied, which takes several seconds for a full transfer at the slowest clock speeds.
+def serial_timeout(clockSpeed, byteCount):
+    # Allow twice as long as the transfer should take, plus a second for the USB serial link
+    return 1 + 2 * byteCount * (9 / I2C_CLOCK_RATES[clockSpeed] + 10 / SERIAL_BAUD_RATE)
+
+# Function to find the latency timer of the BusPirate's FTDI USB serial chip. This is only there on Linux, and only for FTDI serial ports (/dev/ttyUSB*).
+def latency_timer(busPirate):
+    return Path("/sys/bus/usb-serial/devices") / Path(busPirate.port.port).resolve().name / "latency_timer"
+
+# Function to lower the latency timer of the BusPirate's FTDI USB serial chip from its default of 16 ms to 1 ms. The FTDI chip holds on to short responses until the timer runs out,
+# so otherwise every round trip to the BusPirate can take up to 16 ms. Returns the old value so that restore_latency_timer() can put it back, or None if it couldn't be changed.
+def lower_latency_timer(busPirate):
+    try:
+        oldLatency = latency_timer(busPirate).read_text()
+        latency_timer(busPirate).write_text("1")
+    except OSError:
+        print(f"{OutputColours.WARNING}[WARN] Could not lower the USB serial latency timer at {latency_timer(busPirate)}, round trips to the BusPirate may be slower. This only works "
+              f"for FTDI serial ports on Linux, and usually needs root.{OutputColours.END}")
+        return None
+
+    return oldLatency
+
+# Function to put the latency timer back to the value it had before lower_latency_timer() changed it. The timer is a setting for the whole USB serial chip, not just this program.
+def restore_latency_timer(busPirate, oldLatency):
+    try:
+        latency_timer(busPirate).write_text(oldLatency)
+    except OSError:
+        print(f"{OutputColours.WARNING}[WARN] Could not restore the USB serial latency timer at {latency_timer(busPirate)} to {oldLatency.strip()} ms.{OutputColours.END}")
+
+# Function to build the BusPirate's write then read command to write data to the EEPROM without reading anything back. The data can be any bytes-like object or list of ints.
+def write_command(txData):
+    # The command is followed by the big-endian 16-bit number of bytes to write and to read
+    return pack(">BHH", I2C_WRITE_THEN_READ, len(txData), 0x0000) + bytes(txData)
+
+# Function to write data to the EEPROM without reading anything back. The command is sent as a single serial write, and then only the status byte is read back.
+def i2c_write(busPirate, txData):
+    busPirate.port.write(write_command(txData))
+
+    # The BusPirate responds with 0x01 if every byte was ACKed, or 0x00 if the EEPROM sent a NACK
+    if busPirate.port.read(1) != b"\x01":
+        raise ProtocolError(f"{OutputColours.ERROR}[ERR] The EEPROM did not acknowledge the write.{OutputColours.END}")
+
+# Function to send a write command to the EEPROM, and keep sending it until the EEPROM ACKs. The EEPROM doesn't respond to its address while it is still busy writing a page, and
+# nothing is written until it does, so sending the command again is harmless. This only waits as long as the write actually takes, rather than the worst case write time.
+def retry_write(busPirate, command, maxTime = MAXIMUM_WRITE_TIME):
+    timeout = time.monotonic() + maxTime
+    while True:
+        busPirate.port.write(command)
+
+        # The BusPirate responds with 0x01 if every byte was ACKed, or 0x00 if the EEPROM sent a NACK
+        if busPirate.port.read(1) == b"\x01":
+            return
+
+        # If the EEPROM still hasn't responded after the maximum write time, something has gone wrong
+        if time.monotonic() > timeout:
+            raise ProtocolError(f"{OutputColours.ERROR}[ERR] The EEPROM did not finish writing within {maxTime * 1000:.0f} ms.{OutputColours.END}")
+
+# Function to wait for the EEPROM to finish writing a page, by sending it just its write address (which writes nothing) until it ACKs
+def ack_poll(busPirate, writeAddress, maxTime = MAXIMUM_WRITE_TIME):
+    retry_write(busPirate, write_command([writeAddress]), maxTime)
+
+# Function to read data from the EEPROM, starting at the given address. This takes two round trips to the BusPirate, and each command is only sent once the BusPirate has replied
+# to the one before it, as the BusPirate doesn't read its serial port while it is busy on the I2C bus and can only buffer a few bytes.
+def read_eeprom(busPirate, byteAddress, rxCount, writeAddress, readAddress):
+    # Set the EEPROM's address counter with a write of just the big-endian 16-bit byte position. No data is written, so this doesn't start a write cycle.
+    i2c_write(busPirate, pack(">BH", writeAddress, byteAddress))
+
+    # Read the data. The write then read command only writes the read address, and responds with 0x01 followed by the data.
+    busPirate.port.write(pack(">BHHB", I2C_WRITE_THEN_READ, 0x0001, rxCount, readAddress))
+    response = busPirate.port.read(1 + rxCount)
+    if response[:1] != b"\x01" or len(response) != 1 + rxCount:
+        raise ProtocolError(f"{OutputColours.ERROR}[ERR] The EEPROM did not respond to the read.{OutputColours.END}")
+
+    return response[1:]
+
+# Function to build the start of the BusPirate's write command for every page up front: the write then read command and its lengths, the write address of the EEPROM and the
+# byte position to start writing. These are all known before anything is written, and even a 64 KB EEPROM only has a few thousand pages, so none of it needs working out per page.
+def page_headers(totalBytes, bytesPerPage, writeAddress):
+    pageHeaders = []
+    for byteAddress in range(0, totalBytes, bytesPerPage):
+        # The number of bytes to write includes the write address and the byte position, and nothing is read back
+        pageHeaders.append(pack(">BHHBH", I2C_WRITE_THEN_READ, 3 + min(bytesPerPage, totalBytes - byteAddress), 0x0000, writeAddress, byteAddress))
+    return pageHeaders
+
+# Function to write pages to the EEPROM. Each page is a tuple of its header from page_headers() and the data to write to it. Each page is sent to the BusPirate in a single serial
+# write, and nothing else is sent until its status byte has come back. The BusPirate doesn't read its serial port while it is busy on the I2C bus and can only buffer a few bytes, so
+# anything sent behind a command that is still running can be lost.
+def write_pages(busPirate, pages, bytesPerPage, writeAddress, writeProgress):
+    # Allocate a single buffer for a page write, which is reused for every page. It fits the 8 byte header from page_headers() and a full page of data.
+    frameData = bytearray(8 + bytesPerPage)
+    frameView = memoryview(frameData)
+
+    for pageHeader, pageData in pages:
+        # Copy the header and the data into the frame buffer, rather than joining them into a new bytes object for every page
+        frameBytes = len(pageHeader) + len(pageData)
+        frameView[:len(pageHeader)] = pageHeader
+        frameView[len(pageHeader):frameBytes] = pageData
+
+        # The EEPROM doesn't ACK the page while it is still writing the last one, so the page write doubles as the ACK poll. By the time the page has been sent the last one has
+        # usually finished writing, so this rarely needs more than one round trip.
+        retry_write(busPirate, frameView[:frameBytes])
+
         # Update progress bar
-        writeProgress.update(bytesToWrite)
-# Send a stop bit
-busPirate.stop()
-
-# Send a start bit
-busPirate.start()
-print(f"{OutputColours.INFO}[INFO] Verifying wipe operation:{OutputColours.END}")
-# Initialise a progress bar for the verify operation
-verifyError = False
-with tqdm(total = totalBytes, unit = " bytes") as verifyProgress:
-    # Start at address 0
-    byteAddress = 0
-    # If the string length doesn't fit perfectly into a memory page, we need to keep track of which character the last page ended on
-    wiperStringStart = 0
-    
-    # Loop through every available byte on the EEPROM and read it, then compare it to what was flashed
-    while (byteAddress < totalBytes):
-        # Read the max amount of data, or the remaining data (whichever is smaller)
-        bytesToRead = min(args.bytesPerPage, (totalBytes - byteAddress))
-
-        # Load the correct number of bytes for the string to verify against
-        if bytesToRead > wiperStringBytes:
-            # Calculate how many characters would be filled with partial data in this page
-            partialWiperStringBytes = bytesToRead % wiperStringBytes
-            # Calculate how many complete wiper strings will fit in the page
-            completeWiperStrings = int((bytesToRead - partialWiperStringBytes) / wiperStringBytes)
-            # Fill as much of the page with completed wiper strings as possible
-            verifyData = list(wiperString[wiperStringStart:] + wiperString[:wiperStringStart]) * completeWiperStrings
-            # Fill the remainder of the page with a partial string
-            wiperStringEnd = wiperStringStart + partialWiperStringBytes
-            if wiperStringEnd > wiperStringBytes:
-                wiperStringEnd -= wiperStringBytes
-                verifyData += list(wiperString[wiperStringStart:] + wiperString[:wiperStringEnd])
-            else:
-                verifyData += list(wiperString[wiperStringStart:wiperStringEnd])
-            # Keep track of where the string needs to start and end on the next page
-            wiperStringStart += partialWiperStringBytes
-            # Ensure the tracker variables stay within the range of the string
-            while wiperStringStart > wiperStringBytes:
-                wiperStringStart -= wiperStringBytes
-            
-        else:
-            wiperStringEnd = wiperStringStart + bytesToRead
-            if wiperStringEnd > wiperStringBytes:
-                wiperStringEnd -= wiperStringBytes
-                verifyData += list(wiperString[wiperStringStart:] + wiperString[:wiperStringEnd])
-            else:
-                verifyData += list(wiperString[wiperStringStart:wiperStringEnd])
-            verifyData = list(wiperString[0:bytesToRead])
-        
-        # Set the EEPROM address for a sequential read.
-        busPirate.transfer([WRITE_ADDRESS, ((byteAddress >> 8) & 0xFF), (byteAddress & 0xFF) ])
+        writeProgress.update(len(pageData))
 
-        # The only data to be written is the read address of the EEPROM
-        txData = [READ_ADDRESS]
+    # Wait for the last page to finish writing, so that the EEPROM is ready to be read
+    ack_poll(busPirate, writeAddress)
 
-        # Write and then read the specified number of bytes
-        rxData = busPirate.write_then_read(len(txData), bytesToRead, txData)
-        
-        # Compare the read data and the calculated data
-        if bytes(verifyData) != rxData:
-            verifyError = True
-            break
+# Function to split the EEPROM into chunks of up to chunkBytes, yielding the address of each chunk and the part of the wiper pattern that belongs there. The wiper string carries on
+# from where the last chunk ended, so each chunk starts from its address's position in the string. Used for both wiping and verifying, so they always agree on the pattern.
+def wiper_chunks(totalBytes, chunkBytes, wiperView, wiperStringBytes):
+    for byteAddress in range(0, totalBytes, chunkBytes):
+        wiperStringStart = byteAddress % wiperStringBytes
+        yield byteAddress, wiperView[wiperStringStart:wiperStringStart + min(chunkBytes, totalBytes - byteAddress)]
+
+# Function to fill the EEPROM with the wiper pattern. The data for each page is sliced out of wiperView, a memoryview of the wiper pattern, so it isn't copied.
+def wipe_eeprom(busPirate, totalBytes, bytesPerPage, wiperView, wiperStringBytes, writeAddress):
+    # Send a start bit
+    busPirate.start()
+    print(f"{OutputColours.INFO}[INFO] Wiping EEPROM:{OutputColours.END}")
+    # Initialise a progress bar for the write operation
+    # Only redraw the progress bar every 1/256th of the EEPROM and at most every 0.1 s, so that redraws don't add overhead to every page
+    with tqdm(total = totalBytes, unit = " bytes", mininterval = 0.1, miniters = max(1, totalBytes // 256)) as writeProgress:
+        # Pair every page on the EEPROM with the part of the wiper pattern to write to it
+        pages = zip(page_headers(totalBytes, bytesPerPage, writeAddress), (wiperData for _, wiperData in wiper_chunks(totalBytes, bytesPerPage, wiperView, wiperStringBytes)))
 
-        # Calculate the next address to wipe
-        byteAddress += bytesToRead
+        # Write the pages to the EEPROM
+        write_pages(busPirate, pages, bytesPerPage, writeAddress, writeProgress)
+    # Send a stop bit
+    busPirate.stop()
+
+# Function to verify that the EEPROM has been filled with the wiper pattern by reading it back. Returns the address of the first byte that didn't match, or None if the verification
+# passed.
+def verify_wipe(busPirate, totalBytes, wiperView, wiperStringBytes, writeAddress, readAddress):
+    # Send a start bit
+    busPirate.start()
+    print(f"{OutputColours.INFO}[INFO] Verifying wipe operation:{OutputColours.END}")
+    # Initialise a progress bar for the verify operation
+    verifyErrorAddress = None
+    # Only redraw the progress bar every 1/256th of the EEPROM and at most every 0.1 s, so that redraws don't add overhead to every page
+    with tqdm(total = totalBytes, unit = " bytes", mininterval = 0.1, miniters = max(1, totalBytes // 256)) as verifyProgress:
+        # Loop through every available byte on the EEPROM and read it, then compare it to what was flashed. Reading isn't limited to a page at a time, so read as much as the BusPirate
+        # can transfer at once.
+        for byteAddress, verifyData in wiper_chunks(totalBytes, MAXIMUM_RX_TX_BYTES, wiperView, wiperStringBytes):
+            # The last chunk may be shorter than the others
+            bytesToRead = len(verifyData)
+
+            # Read the same number of bytes back from the EEPROM
+            rxData = read_eeprom(busPirate, byteAddress, bytesToRead, writeAddress, readAddress)
         
-        # Update progress bar
-        verifyProgress.update(bytesToRead)
-# Send a stop bit
-busPirate.stop()
+            # Compare the read data and the calculated data
+            if verifyData != rxData:
+                # Find the first byte that doesn't match, so that the user knows where the verification failed. This only runs once, so it doesn't need to be quick.
+                verifyErrorAddress = byteAddress + next(i for i in range(bytesToRead) if verifyData[i] != rxData[i])
+                break
+
+            # Update progress bar
+            verifyProgress.update(bytesToRead)
+    # Send a stop bit
+    busPirate.stop()
+
+    return verifyErrorAddress
+
+# Function to read and check the user's inputs, then wipe the EEPROM and verify it
+def main():
+    # -------------------------------------------------------------------------------------------- Argument Parser -------------------------------------------------------------------------------------------------
+    # Set up the argument parser to retreive inputs from the user
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+                                     epilog="To see where the time goes, profile a run with: python -m cProfile -s cumulative BusPirate_I2C_EEPROM_Wipe.py -b <bytes per page> -p <total pages>")
+    parser.add_argument("-a", "--address",        dest="address",       help="The I2C address of the EEPROM module (Note: not the read or write addresses).",    type=auto_int,  required=False, default=hex(0x50))
+    parser.add_argument("-c", "--clock-speed",    dest="clockSpeed",    help="The clock speed to use when communicating with the EEPROM module.",                type=str,  required=False, default="400kHz", choices=["400kHz", "100kHz", "50kHz", "5kHz"])
+    parser.add_argument("-P", "--port",           dest="port",          help="The serial port of the BusPirate. Found automatically if not given.",              type=str,  required=False, default=None)
+    parser.add_argument("-b", "--bytes-per-page", dest="bytesPerPage",  help="The number of bytes per page listed in the EEPROM datasheet.",                     type=int,  required=True)
+    parser.add_argument("-p", "--total-pages",    dest="totalPages",    help="The number of memory pages listed in the EEPROM datasheet.",                       type=int,  required=True)
+    parser.add_argument("-s", "--hexstring",      dest="hexString",     help="A string of hex characters that will be used to output to wipe the EEPROM.",       type=str,  required=False, default="00")
+    parser.add_argument("-e", "--enable-pullups", dest="enablePullups", help="Enable the internal pullup resistors in the BusPirate. Disabled by default.",      action="store_true")
+    parser.add_argument("-l", "--low-latency",    dest="lowLatency",    help="Lower the USB serial latency timer to 1 ms while running. Linux FTDI only.",       action="store_true")
+    parser.add_argument("-v", "--verbose",        dest="verbose",       help="Print verbose messages.",                                                          action="store_true")
+
+    # Parse the user inputs using the argument parser
+    args = parser.parse_args()
+    # --------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    # -------------------------------------------------------------------------------------------- Input Valudation ------------------------------------------------------------------------------------------------
+    # Check that a valid I2C address has been provided
+    if args.address > MAXIMUM_I2C_ADDRESS:
+        raise ValueError(f"{OutputColours.ERROR}[ERR] The maximum I2C address should be {hex(MAXIMUM_I2C_ADDRESS)}, but {hex(args.address)} was provided.{OutputColours.END}")
+
+    # Convert the I2C address to a read and write address. The I2C address is the 7 most significant bits of the address, as the least significant bit denotes read (1) or write (0) mode.
+    READ_ADDRESS = (args.address << 1) | 0b00000001   # The EEPROM read address is the I2C address but bit shifted and with a 1 in the LSB
+    WRITE_ADDRESS = (args.address << 1) & 0b11111110  # The EEPROM write address is the I2C address but bit shifted and with a 0 in the LSB
+
+    # Check that the EEPROM has at least one page, and that each page has at least one byte
+    if args.bytesPerPage < 1 or args.totalPages < 1:
+        raise ValueError(f"{OutputColours.ERROR}[ERR] The bytes per page (-b) and total pages (-p) must both be at least 1, but {args.bytesPerPage} and {args.totalPages} were provided.{OutputColours.END}")
+
+    # Calculate the total number of bytes to generate
+    totalBytes = args.bytesPerPage * args.totalPages
+
+    # Ensure that the specified file can be writted to a device with 16-bit addresses, as this is what the other scripts here support.
+    if totalBytes > MAXIMUM_MEMORY_ADDRESS:
+        raise ValueError(f"{OutputColours.ERROR}[ERR] These scripts can operate with up to 16-bit memory addresses. The maximum possible address is {MAXIMUM_MEMORY_ADDRESS}, but up to address {totalBytes} was "
+                         f"requested. Consider lowering the pages (-p) value.{OutputColours.END}")
+
+    # Convert the hex string into an immutable array of bytes. This is checked before anything is written, so that a bad hex string can't leave the EEPROM half wiped.
+    try:
+        wiperString = bytes.fromhex(args.hexString)
+    except ValueError:
+        raise ValueError(f"{OutputColours.ERROR}[ERR] The hex string (-s) should be made up of pairs of hex characters, but {args.hexString} was provided.{OutputColours.END}") from None
+    wiperStringBytes = len(wiperString)
+
+    # Check that there is something to wipe the EEPROM with
+    if wiperStringBytes == 0:
+        raise ValueError(f"{OutputColours.ERROR}[ERR] The hex string (-s) must contain at least one byte.{OutputColours.END}")
+
+    # Repeat the wiper string enough times that any page or verify read can be sliced out of it, starting from any position in the string. This is only built once, rather than for every page.
+    wiperPattern = wiperString * ((max(args.bytesPerPage, MAXIMUM_RX_TX_BYTES) // wiperStringBytes) + 2)
+    # --------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------------
+
+    # Create a busPirate object configured to communicate over I2C
+    # Skip searching for the BusPirate if the user has said which port it is on
+    busPirate = I2C(portname = args.port) if args.port else I2C()
+
+    # Make round trips to the BusPirate as quick as possible, if the user has asked for it
+    oldLatency = lower_latency_timer(busPirate) if args.lowLatency else None
+
+    try:
+        # A full verify read can take several seconds at the slowest clock speeds, so make sure the serial port doesn't time out part way through one. The read address is sent as well.
+        busPirate.port.timeout = serial_timeout(args.clockSpeed, 1 + MAXIMUM_RX_TX_BYTES)
+
+        # Set the I2C clock speed of the BusPirate, and configure its power output and internal pullup resistors
+        configure_bus_pirate(busPirate, args.clockSpeed, args.enablePullups)
+
+        # The data for writing and verifying is sliced out of the same view of the wiper pattern
+        wiperView = memoryview(wiperPattern)
+
+        # Wipe the EEPROM, and then verify it
+        wipe_eeprom(busPirate, totalBytes, args.bytesPerPage, wiperView, wiperStringBytes, WRITE_ADDRESS)
+        verifyErrorAddress = verify_wipe(busPirate, totalBytes, wiperView, wiperStringBytes, WRITE_ADDRESS, READ_ADDRESS)
 
-# Reset the BusPirate to disable all outputs and reset it to "HiZ" mode. Should also free up the COM port.
-busPirate.hw_reset()
+        # Reset the BusPirate to disable all outputs and reset it to "HiZ" mode. Should also free up the COM port.
+        busPirate.hw_reset()
+    finally:
+        # Put the latency timer back as it was, even if something went wrong, as other programs using the serial port will expect it
+        if oldLatency != None:
+            restore_latency_timer(busPirate, oldLatency)
 
-# Output info to the user
-if verifyError:
-    print(f"{OutputColours.ERROR}[ERR] Verification failed.{OutputColours.END}")
-else:
-    print(f"{OutputColours.INFO}[INFO] EEPROM wiped successfully.{OutputColours.END}")
+    # Output info to the user
+    if verifyErrorAddress != None:
+        print(f"{OutputColours.ERROR}[ERR] Verification failed at address {hex(verifyErrorAddress)}.{OutputColours.END}")
+    else:
+        print(f"{OutputColours.INFO}[INFO] EEPROM wiped successfully.{OutputColours.END}")
 
+# Only talk to the BusPirate when run as a script, rather than when imported
+if __name__ == "__main__":
+    main()